@@ -1,20 +1,18 @@
 """Command-line interface for stock analysis Q&A."""
 
 import sys
+import time
 from rich.console import Console
 from rich.panel import Panel
-from rich.prompt import Prompt
-from rich.markdown import Markdown
 
 from .config import settings
-from .vectordb.qdrant_client import StockVectorDB
-from .vectordb.embeddings import EmbeddingModel
-from .rag.retriever import StockRetriever
-from .rag.generator import StockAnalysisGenerator
 
 
 console = Console()
 
+# Live redraws per second while an answer streams in
+REFRESH_PER_SECOND = 8
+
 
 def main():
     """Main CLI entry point."""
@@ -28,6 +26,15 @@ def main():
     try:
         console.print("\n[yellow]正在初始化系統...[/yellow]")
 
+        # Deferred so the banner shows before torch/qdrant-client are loaded
+        from rich.live import Live
+        from rich.markdown import Markdown
+        from rich.prompt import Prompt
+        from .vectordb.qdrant_client import StockVectorDB
+        from .vectordb.embeddings import EmbeddingModel
+        from .rag.retriever import StockRetriever
+        from .rag.generator import StockAnalysisGenerator
+
         # Vector DB (uses config.yaml settings)
         vector_db = StockVectorDB()
 
@@ -49,7 +56,9 @@ def main():
         # Generator
         generator = StockAnalysisGenerator(
             model_name=settings.ollama.model,
-            ollama_host=settings.ollama.host
+            ollama_host=settings.ollama.host,
+            num_ctx=settings.ollama.num_ctx,
+            num_keep=settings.ollama.num_keep
         )
 
         # Check if model is available
@@ -67,6 +76,14 @@ def main():
         # Retriever
         retriever = StockRetriever(vector_db, embedding_model)
 
+        def answer_panel(response: str) -> Panel:
+            """Render an answer as Markdown in a panel."""
+            return Panel(
+                Markdown(response),
+                title="[bold green]分析結果[/bold green]",
+                border_style="green"
+            )
+
         # Interactive Q&A loop
         console.print("[bold]開始問答（輸入 'quit' 或 'exit' 退出）[/bold]\n")
 
@@ -92,18 +109,22 @@ def main():
                 # Format context
                 context = retriever.format_context(results)
 
-                # Generate response
+                # Generate response, rendering tokens as they stream in.
+                # Re-parsing the Markdown on every token is quadratic in the
+                # answer length, so it is only redrawn at the refresh rate.
                 console.print("[dim]正在生成回答...[/dim]\n")
-                response = generator.generate(
-                    query, context, system_prompt=settings.system_prompt
-                )
-
-                # Display response
-                console.print(Panel(
-                    Markdown(response),
-                    title="[bold green]分析結果[/bold green]",
-                    border_style="green"
-                ))
+                response = ""
+                last_render = 0.0
+                with Live(console=console, refresh_per_second=REFRESH_PER_SECOND) as live:
+                    for chunk in generator.generate_stream(
+                        query, context, system_prompt=settings.system_prompt
+                    ):
+                        response += chunk
+                        now = time.monotonic()
+                        if now - last_render >= 1 / REFRESH_PER_SECOND:
+                            live.update(answer_panel(response))
+                            last_render = now
+                    live.update(answer_panel(response))
 
                 # Show sources
                 console.print("\n[dim]資料來源：[/dim]")
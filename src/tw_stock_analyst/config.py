@@ -1,37 +1,63 @@
 """Configuration management using YAML."""
 
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
+# libyaml-backed loader when available, pure-Python otherwise
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-class QdrantConfig(BaseModel):
+
+class FrozenModel(BaseModel):
+    """Immutable settings model (instances are shared via from_yaml's cache)."""
+    model_config = ConfigDict(frozen=True)
+
+
+class QdrantConfig(FrozenModel):
     """Qdrant configuration."""
     host: str = "localhost"
     port: int = 6333
+    grpc_port: int = 6334
+    prefer_grpc: bool = True  # Send points as packed protobuf floats instead of JSON
     collection_name: str = "stock_analysis"
+    batch_size: int = 32  # Points per upsert request during sync
+    concurrency: int = 4  # Stocks processed concurrently during sync
+    quantization: Literal["scalar", "binary", "none"] = "scalar"  # For new collections
+    on_disk: bool = True  # Keep original vectors on disk (quantized copies stay in RAM)
+    oversampling: float = 2.0  # Candidates fetched per result before rescoring
+    rescore: bool = True  # Rescore quantized candidates with the original vectors
 
 
-class FinMindConfig(BaseModel):
+class FinMindConfig(FrozenModel):
     """FinMind API configuration."""
     api_url: str = "https://api.finmindtrade.com/api/v4/data"
     token: str = ""
 
 
-class OllamaConfig(BaseModel):
+class OllamaConfig(FrozenModel):
     """Ollama configuration."""
     host: str = "http://localhost:11434"
     model: str = "deepseek-r1:1.5b"
+    num_ctx: int = 4096  # Context window size in tokens
+    num_keep: Optional[int] = None  # Tokens kept when the window shifts (the system prompt's tokens)
 
 
-class EmbeddingConfig(BaseModel):
+class EmbeddingConfig(FrozenModel):
     """Embedding model configuration."""
     model: str = "paraphrase-multilingual-MiniLM-L12-v2"
     vector_size: int = 384
+    backend: Literal["onnx", "openvino", "torch"] = "torch"  # Changing it requires re-syncing stored vectors
+    quantization: str = ""  # Opt-in int8 config (ONNX target; any value enables OpenVINO int8); empty disables
+    batch_size: int = 64  # Texts per forward pass when encoding in bulk
+    threads: int = 0  # Torch intra-op CPU threads; 0 uses all cores
+    bf16: bool = False  # Torch bfloat16 autocast on CPU (needs AVX-512 BF16 / AMX)
+    device: Literal["auto", "cpu", "cuda", "mps"] = "auto"  # Torch device; auto prefers CUDA, then MPS
+    gpu_batch_size: int = 128  # Minimum texts per forward pass on a GPU
 
 
-class DataConfig(BaseModel):
+class DataConfig(FrozenModel):
     """Data loading configuration."""
     default_days: int = 30
     num_quarters: int = 4  # Number of quarters of fundamental data to load
@@ -59,12 +85,12 @@ class DataConfig(BaseModel):
         return list(self.stocks.keys())
 
 
-class RAGConfig(BaseModel):
+class RAGConfig(FrozenModel):
     """RAG configuration."""
     top_k: int = 5
 
 
-class Settings(BaseModel):
+class Settings(FrozenModel):
     """Application settings."""
     qdrant: QdrantConfig = Field(default_factory=QdrantConfig)
     finmind: FinMindConfig = Field(default_factory=FinMindConfig)
@@ -81,8 +107,9 @@ class Settings(BaseModel):
 4. 提醒投資風險"""
 
     @classmethod
+    @lru_cache(maxsize=1)
     def from_yaml(cls, config_path: Optional[Path] = None) -> "Settings":
-        """Load settings from YAML file."""
+        """Load settings from YAML file (the parsed result is cached)."""
         if config_path is None:
             config_path = Path("config.yaml")
 
@@ -91,7 +118,7 @@ class Settings(BaseModel):
             return cls()
 
         with open(config_path, "r", encoding="utf-8") as f:
-            config_data = yaml.safe_load(f)
+            config_data = yaml.load(f, Loader=_YamlLoader)
 
         return cls(**config_data)
 
@@ -1,6 +1,23 @@
 """Fundamental data processing and formatting."""
 
-from typing import Optional
+import sys
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import numpy as np
+
+# Fixed part of the fundamentals text; optional ratio lines are appended
+_TMPL = "\n".join([
+    "股票代碼：{stock_id}",
+    "公司名稱：{stock_name}",
+    "財報日期：{date}",
+    "",
+    "基本面資訊：",
+    "營收：{revenue:.2f}百萬元",
+    "營業利益：{operating_income:.2f}百萬元",
+    "淨利：{net_income:.2f}百萬元",
+    "每股盈餘(EPS)：{eps:.2f}元",
+])
 
 
 class FundamentalFormatter:
@@ -62,6 +79,77 @@ class FundamentalFormatter:
 
         return "\n".join(lines)
 
+    @staticmethod
+    def format_many(
+        stock_id: str,
+        stock_name: str,
+        records: list[dict],
+        price: Optional[float] = None
+    ) -> list[str]:
+        """
+        Format many fundamental records of one stock at once.
+
+        Produces the same text as format_as_text for each record, but scales
+        revenues and computes margins with NumPy over all records.
+
+        Args:
+            stock_id: Stock code
+            stock_name: Stock name
+            records: List of dictionaries with fundamental metrics
+            price: Current stock price (optional)
+
+        Returns:
+            List of formatted text descriptions, one per record
+        """
+        n = len(records)
+        if n == 0:
+            return []
+
+        def column(key: str) -> np.ndarray:
+            return np.fromiter(
+                (r.get(key, 0) for r in records), dtype=np.float64, count=n
+            )
+
+        rev = column('revenue')
+        op = column('operating_income')
+        net = column('net_income')
+        eps = column('eps')
+
+        has_rev = rev > 0
+        has_om = (has_rev & (op != 0)).tolist()
+        has_nm = (has_rev & (net != 0)).tolist()
+        has_pe = ((eps > 0) & bool(price)).tolist()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            om = (op / rev * 100).tolist()
+            nm = (net / rev * 100).tolist()
+            pe = ((price or 0) / eps).tolist()
+
+        rev_m = (rev / 1_000_000).tolist()
+        op_m = (op / 1_000_000).tolist()
+        net_m = (net / 1_000_000).tolist()
+        eps_l = eps.tolist()
+
+        texts = []
+        for i, record in enumerate(records):
+            text = _TMPL.format_map({
+                'stock_id': stock_id,
+                'stock_name': stock_name,
+                'date': record.get('date', 'N/A'),
+                'revenue': rev_m[i],
+                'operating_income': op_m[i],
+                'net_income': net_m[i],
+                'eps': eps_l[i],
+            })
+            if has_om[i]:
+                text += f"\n營業利益率：{om[i]:.2f}%"
+            if has_nm[i]:
+                text += f"\n淨利率：{nm[i]:.2f}%"
+            if has_pe[i]:
+                text += f"\n本益比(PE)：{pe[i]:.2f}"
+            texts.append(text)
+
+        return texts
+
     @staticmethod
     def calculate_ratios(fundamentals: dict, price: Optional[float] = None) -> dict:
         """
@@ -95,6 +183,11 @@ class FundamentalFormatter:
 
 from ..config import settings
 
+# Built once at import; interned codes let dict lookups match on identity
+_STOCK_NAMES: Mapping[str, str] = MappingProxyType({
+    sys.intern(code): name for code, name in settings.data.stocks.items()
+})
+
 
 def get_stock_name(stock_id: str) -> str:
     """
@@ -106,4 +199,4 @@ def get_stock_name(stock_id: str) -> str:
     Returns:
         Stock name, or stock code if not found
     """
-    return settings.data.stocks.get(stock_id, stock_id)
+    return _STOCK_NAMES.get(stock_id, stock_id)
@@ -1,7 +1,328 @@
-"""Technical indicators calculation using TA library."""
+"""Technical indicators calculation using fused NumPy/Numba kernels."""
 
+import math
+
+import numpy as np
 import pandas as pd
-import ta
+from numba import njit
+
+# Indicator parameters (same defaults as the TA library)
+MA_WINDOWS = (5, 10, 20, 60)
+RSI_WINDOW = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BB_WINDOW = 20
+BB_DEV = 2.0
+STOCH_WINDOW = 14
+STOCH_SMOOTH = 3
+ATR_WINDOW = 14
+
+# Output columns of the indicator kernel, in matrix column order
+INDICATOR_COLUMNS = (
+    'MA5', 'MA10', 'MA20', 'MA60', 'EMA12', 'EMA26', 'RSI',
+    'MACD', 'MACD_Signal', 'MACD_Diff', 'BB_High', 'BB_Mid', 'BB_Low',
+    'K', 'D', 'ATR', 'OBV', 'Price_Change',
+)
+(
+    _MA5, _MA10, _MA20, _MA60, _EMA12, _EMA26, _RSI,
+    _MACD, _MACD_SIGNAL, _MACD_DIFF, _BB_HIGH, _BB_MID, _BB_LOW,
+    _K, _D, _ATR, _OBV, _PRICE_CHANGE,
+) = range(len(INDICATOR_COLUMNS))
+_MA_COLS = (_MA5, _MA10, _MA20, _MA60)
+_N_COLUMNS = len(INDICATOR_COLUMNS)
+
+# EMA smoothing tables for MACD fast/slow/signal, hoisted so each update
+# in the kernel is a single multiply-add per EMA
+_EMA_ALPHAS = np.array([2.0 / (MACD_FAST + 1), 2.0 / (MACD_SLOW + 1), 2.0 / (MACD_SIGNAL + 1)])
+_EMA_DECAYS = 1.0 - _EMA_ALPHAS
+
+# Ring buffer of recent closes shared by all MA windows and Bollinger;
+# a power of two larger than the longest window so indexing is a mask
+_RING_SIZE = 64
+_RING_MASK = _RING_SIZE - 1
+_BB_MA = MA_WINDOWS.index(BB_WINDOW)
+
+# (result key, source column, default if missing, cast) for get_latest_indicators
+_LATEST_FIELDS = (
+    ('date', 'Date', '', None),
+    ('close', 'Close', 0, float),
+    ('volume', 'Volume', 0, int),
+    ('price_change', 'Price_Change', 0, float),
+    ('ma5', 'MA5', 0, float),
+    ('ma20', 'MA20', 0, float),
+    ('ma60', 'MA60', 0, float),
+    ('rsi', 'RSI', 0, float),
+    ('macd', 'MACD', 0, float),
+    ('macd_signal', 'MACD_Signal', 0, float),
+    ('k', 'K', 0, float),
+    ('d', 'D', 0, float),
+    ('bb_high', 'BB_High', 0, float),
+    ('bb_low', 'BB_Low', 0, float),
+)
+
+# Technical text template; format_as_text and format_batch produce the same text
+_TEXT_TMPL = "\n".join([
+    "股票代碼：{stock_id}",
+    "公司名稱：{stock_name}",
+    "日期：{date}",
+    "收盤價：{close}",
+    "漲跌幅：{price_change}",
+    "成交量：{volume}",
+    "",
+    "技術指標：",
+    "- MA5：{ma5}",
+    "- MA20：{ma20}",
+    "- MA60：{ma60}",
+    "- RSI(14)：{rsi}",
+    "- MACD：{macd}",
+    "- MACD訊號：{macd_signal}",
+    "- KD指標：K={k}, D={d}",
+    "- 布林通道：上軌{bb_high}, 下軌{bb_low}",
+])
+
+# (key, cast, format spec, unit) of the numeric template fields; the unit
+# is only appended to present values, so gaps read "N/A" and not "N/A%"
+_TEXT_FIELDS = (
+    ('close', float, '.2f', '元'),
+    ('price_change', float, '+.2f', '%'),
+    ('volume', int, ',', '張'),
+    ('ma5', float, '.2f', ''),
+    ('ma20', float, '.2f', ''),
+    ('ma60', float, '.2f', ''),
+    ('rsi', float, '.2f', ''),
+    ('macd', float, '.4f', ''),
+    ('macd_signal', float, '.4f', ''),
+    ('k', float, '.2f', ''),
+    ('d', float, '.2f', ''),
+    ('bb_high', float, '.2f', ''),
+    ('bb_low', float, '.2f', ''),
+)
+
+
+def _format_value(value, cast, spec: str, unit: str) -> str:
+    """Format one template value; None/NaN (e.g. indicator warm-up) renders as N/A."""
+    if value is None or value != value:
+        return "N/A"
+    return format(cast(value), spec) + unit
+
+
+# Every fast-math flag except nnan/ninf: NaN marks indicator warm-up
+# periods and must survive the kernel.
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
+@njit(cache=True, fastmath=_FASTMATH, error_model="numpy")
+def _compute_indicators(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray
+) -> np.ndarray:
+    """
+    Compute every indicator in INDICATOR_COLUMNS in one pass over the bars.
+
+    Results match the TA library (fillna=False): warm-up values are NaN,
+    except ATR whose warm-up values are 0. Prices may be float32 or
+    float64; running sums and the output are always float64.
+
+    Returns:
+        (N, len(INDICATOR_COLUMNS)) float64 matrix
+    """
+    n = close.shape[0]
+    out = np.full((n, _N_COLUMNS), np.nan)
+
+    a_rsi = 1.0 / RSI_WINDOW
+
+    # Running EMA state: fast, slow, signal (seeded at the first valid value)
+    ema = np.full(3, np.nan)
+    # Decayed weight of the fast/slow EMAs across missing closes
+    ema_wt = np.ones(2)
+    n_close = 0
+    n_macd = 0
+
+    # Wilder's smoothing for RSI gains/losses
+    avg_up = 0.0
+    avg_dn = 0.0
+
+    # Rolling sums for MA/Bollinger over a ring buffer of closes,
+    # shifted by the first close for precision
+    ref = np.nan
+    ring = np.empty(_RING_SIZE)
+    ma_sum = np.zeros(len(MA_WINDOWS))
+    ma_count = np.zeros(len(MA_WINDOWS), np.int64)
+    bb_sumsq = 0.0
+
+    # Monotonic deques (index buffers) for rolling low-min and high-max
+    min_q = np.empty(n, np.int64)
+    max_q = np.empty(n, np.int64)
+    min_head = 0
+    min_tail = 0
+    max_head = 0
+    max_tail = 0
+    hl_nan = 0
+
+    atr_sum = 0.0
+    atr = 0.0
+    obv = 0.0
+
+    for i in range(n):
+        c = close[i]
+        h = high[i]
+        lo = low[i]
+        prev_c = close[i - 1] if i > 0 else np.nan
+        row = out[i]
+
+        # Moving averages
+        if np.isnan(ref) and not np.isnan(c):
+            ref = c
+        x = c - ref
+        ring[i & _RING_MASK] = x
+        for w in range(len(MA_WINDOWS)):
+            window = MA_WINDOWS[w]
+            if not np.isnan(x):
+                ma_sum[w] += x
+                ma_count[w] += 1
+            if i >= window:
+                old = ring[(i - window) & _RING_MASK]
+                if not np.isnan(old):
+                    ma_sum[w] -= old
+                    ma_count[w] -= 1
+            if ma_count[w] == window:
+                row[_MA_COLS[w]] = ma_sum[w] / window + ref
+
+        # MACD: EMA12/EMA26 and EMA9 signal over MACD
+        if not np.isnan(c):
+            if n_close == 0:
+                ema[0] = c
+                ema[1] = c
+            else:
+                for j in range(2):
+                    if ema_wt[j] == 1.0:
+                        ema[j] = _EMA_ALPHAS[j] * c + _EMA_DECAYS[j] * ema[j]
+                    else:
+                        w = ema_wt[j] * _EMA_DECAYS[j]
+                        ema[j] = (w * ema[j] + _EMA_ALPHAS[j] * c) / (w + _EMA_ALPHAS[j])
+                        ema_wt[j] = 1.0
+            n_close += 1
+        elif n_close > 0:
+            # Like pandas ewm (ignore_na=False), the EMA keeps decaying over gaps
+            for j in range(2):
+                ema_wt[j] *= _EMA_DECAYS[j]
+        if n_close >= MACD_FAST:
+            row[_EMA12] = ema[0]
+        if n_close >= MACD_SLOW:
+            row[_EMA26] = ema[1]
+            m = ema[0] - ema[1]
+            row[_MACD] = m
+            if n_macd == 0:
+                ema[2] = m
+            else:
+                ema[2] = _EMA_ALPHAS[2] * m + _EMA_DECAYS[2] * ema[2]
+            n_macd += 1
+            if n_macd >= MACD_SIGNAL:
+                row[_MACD_SIGNAL] = ema[2]
+                row[_MACD_DIFF] = m - ema[2]
+
+        # RSI
+        diff = c - prev_c
+        up = diff if diff > 0 else 0.0
+        dn = -diff if diff < 0 else 0.0
+        if i == 0:
+            avg_up = up
+            avg_dn = dn
+        else:
+            avg_up = a_rsi * up + (1.0 - a_rsi) * avg_up
+            avg_dn = a_rsi * dn + (1.0 - a_rsi) * avg_dn
+        if i >= RSI_WINDOW - 1:
+            if avg_dn == 0:
+                row[_RSI] = 100.0
+            else:
+                row[_RSI] = 100.0 - 100.0 / (1.0 + avg_up / avg_dn)
+
+        # Bollinger Bands (population std over BB_WINDOW closes, mean from MA)
+        if not np.isnan(x):
+            bb_sumsq += x * x
+        if i >= BB_WINDOW:
+            old = ring[(i - BB_WINDOW) & _RING_MASK]
+            if not np.isnan(old):
+                bb_sumsq -= old * old
+        if ma_count[_BB_MA] == BB_WINDOW:
+            mean = ma_sum[_BB_MA] / BB_WINDOW
+            var = bb_sumsq / BB_WINDOW - mean * mean
+            std = math.sqrt(var) if var > 0 else 0.0
+            row[_BB_MID] = mean + ref
+            row[_BB_HIGH] = mean + ref + BB_DEV * std
+            row[_BB_LOW] = mean + ref - BB_DEV * std
+
+        # KD: %K from rolling low-min/high-max, %D = SMA3 of %K
+        if np.isnan(h) or np.isnan(lo):
+            hl_nan += 1
+        if i >= STOCH_WINDOW and (np.isnan(high[i - STOCH_WINDOW]) or np.isnan(low[i - STOCH_WINDOW])):
+            hl_nan -= 1
+        while min_tail > min_head and low[min_q[min_tail - 1]] >= lo:
+            min_tail -= 1
+        min_q[min_tail] = i
+        min_tail += 1
+        while max_tail > max_head and high[max_q[max_tail - 1]] <= h:
+            max_tail -= 1
+        max_q[max_tail] = i
+        max_tail += 1
+        while min_q[min_head] <= i - STOCH_WINDOW:
+            min_head += 1
+        while max_q[max_head] <= i - STOCH_WINDOW:
+            max_head += 1
+        if i >= STOCH_WINDOW - 1 and hl_nan == 0:
+            lowest = low[min_q[min_head]]
+            highest = high[max_q[max_head]]
+            row[_K] = 100.0 * (c - lowest) / (highest - lowest)
+        if i >= STOCH_WINDOW + STOCH_SMOOTH - 2:
+            k_sum = 0.0
+            for j in range(STOCH_SMOOTH):
+                k_sum += out[i - j, _K]
+            row[_D] = k_sum / STOCH_SMOOTH
+
+        # ATR: Wilder's smoothing seeded with the mean of the first window
+        tr = h - lo
+        if i > 0:
+            tr_high = abs(h - prev_c)
+            tr_low = abs(lo - prev_c)
+            if np.isnan(tr) or tr_high > tr:
+                tr = tr_high
+            if np.isnan(tr) or tr_low > tr:
+                tr = tr_low
+        if i < ATR_WINDOW:
+            atr_sum += tr
+            if i == ATR_WINDOW - 1:
+                atr = atr_sum / ATR_WINDOW
+        else:
+            atr = (atr * (ATR_WINDOW - 1) + tr) / ATR_WINDOW
+        row[_ATR] = atr
+
+        # OBV
+        v = volume[i]
+        if not np.isnan(v):
+            if c < prev_c:
+                obv -= v
+            else:
+                obv += v
+            row[_OBV] = obv
+
+        # Price change (%)
+        if i > 0:
+            row[_PRICE_CHANGE] = (c / prev_c - 1.0) * 100.0
+
+    return out
+
+
+def _price_array(series: pd.Series) -> np.ndarray:
+    """
+    Get a contiguous float32 array for the indicator kernel.
+
+    Only the kernel input is narrowed (twice the SIMD lanes); the frame
+    keeps its float64 prices for the stored payload.
+    """
+    return np.ascontiguousarray(series.to_numpy(np.float32))
 
 
 class TechnicalIndicators:
@@ -18,56 +339,41 @@ class TechnicalIndicators:
         Returns:
             DataFrame with added indicator columns
         """
-        df = df.copy()
+        # Recomputing replaces existing indicator columns
+        df = df.drop(columns=[col for col in INDICATOR_COLUMNS if col in df.columns])
 
         # Ensure numeric types
         for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
             df[col] = pd.to_numeric(df[col], errors='coerce')
 
-        # Moving Averages
-        df['MA5'] = ta.trend.sma_indicator(df['Close'], window=5)
-        df['MA10'] = ta.trend.sma_indicator(df['Close'], window=10)
-        df['MA20'] = ta.trend.sma_indicator(df['Close'], window=20)
-        df['MA60'] = ta.trend.sma_indicator(df['Close'], window=60)
-
-        # Exponential Moving Averages
-        df['EMA12'] = ta.trend.ema_indicator(df['Close'], window=12)
-        df['EMA26'] = ta.trend.ema_indicator(df['Close'], window=26)
-
-        # RSI (Relative Strength Index)
-        df['RSI'] = ta.momentum.rsi(df['Close'], window=14)
-
-        # MACD
-        macd = ta.trend.MACD(df['Close'])
-        df['MACD'] = macd.macd()
-        df['MACD_Signal'] = macd.macd_signal()
-        df['MACD_Diff'] = macd.macd_diff()
-
-        # Bollinger Bands
-        bollinger = ta.volatility.BollingerBands(df['Close'])
-        df['BB_High'] = bollinger.bollinger_hband()
-        df['BB_Mid'] = bollinger.bollinger_mavg()
-        df['BB_Low'] = bollinger.bollinger_lband()
-
-        # KD (Stochastic Oscillator)
-        stoch = ta.momentum.StochasticOscillator(
-            df['High'], df['Low'], df['Close']
-        )
-        df['K'] = stoch.stoch()
-        df['D'] = stoch.stoch_signal()
+        high = _price_array(df['High'])
+        low = _price_array(df['Low'])
+        close = _price_array(df['Close'])
+        # Volume stays float64: float32 cannot represent large volumes exactly
+        volume = np.ascontiguousarray(df['Volume'].to_numpy(np.float64))
 
-        # ATR (Average True Range)
-        df['ATR'] = ta.volatility.average_true_range(
-            df['High'], df['Low'], df['Close']
+        # One matrix for all indicators, attached with a single concat
+        values = _compute_indicators(high, low, close, volume)
+        indicators = pd.DataFrame(
+            values, columns=list(INDICATOR_COLUMNS), index=df.index, copy=False
         )
 
-        # OBV (On Balance Volume)
-        df['OBV'] = ta.volume.on_balance_volume(df['Close'], df['Volume'])
+        return pd.concat([df, indicators], axis=1, copy=False)
 
-        # Price change
-        df['Price_Change'] = df['Close'].pct_change() * 100
+    @staticmethod
+    def _column_index(df: pd.DataFrame) -> dict[str, int]:
+        """Get the column -> position map of a frame."""
+        return {col: i for i, col in enumerate(df.columns)}
 
-        return df
+    @staticmethod
+    def _record_to_indicators(record: np.ndarray, colidx: dict[str, int]) -> dict:
+        """Convert one positional row into the latest-indicators dict."""
+        indicators = {}
+        for key, col, default, cast in _LATEST_FIELDS:
+            i = colidx.get(col)
+            value = record[i] if i is not None else default
+            indicators[key] = cast(value) if cast is not None else value
+        return indicators
 
     @staticmethod
     def get_latest_indicators(df: pd.DataFrame) -> dict:
@@ -83,23 +389,34 @@ class TechnicalIndicators:
         if df.empty:
             return {}
 
-        latest = df.iloc[-1]
-        return {
-            'date': latest.get('Date', ''),
-            'close': float(latest.get('Close', 0)),
-            'volume': int(latest.get('Volume', 0)),
-            'price_change': float(latest.get('Price_Change', 0)),
-            'ma5': float(latest.get('MA5', 0)),
-            'ma20': float(latest.get('MA20', 0)),
-            'ma60': float(latest.get('MA60', 0)),
-            'rsi': float(latest.get('RSI', 0)),
-            'macd': float(latest.get('MACD', 0)),
-            'macd_signal': float(latest.get('MACD_Signal', 0)),
-            'k': float(latest.get('K', 0)),
-            'd': float(latest.get('D', 0)),
-            'bb_high': float(latest.get('BB_High', 0)),
-            'bb_low': float(latest.get('BB_Low', 0)),
-        }
+        colidx = TechnicalIndicators._column_index(df)
+        # Only the last row is converted, not the whole frame (df.values)
+        record = df.iloc[-1:].to_numpy()[0]
+        return TechnicalIndicators._record_to_indicators(record, colidx)
+
+    @staticmethod
+    def get_latest_indicators_batch(dfs: list[pd.DataFrame]) -> list[dict]:
+        """
+        Get latest technical indicator values for many DataFrames.
+
+        Args:
+            dfs: DataFrames with calculated indicators
+
+        Returns:
+            List of latest indicator dicts, in input order ({} for empty frames)
+        """
+        non_empty = [i for i, df in enumerate(dfs) if not df.empty]
+        results = [{} for _ in dfs]
+        if not non_empty:
+            return results
+
+        # Stack the last rows and convert them to NumPy once
+        latest = pd.concat([dfs[i].iloc[-1:] for i in non_empty], ignore_index=True)
+        colidx = TechnicalIndicators._column_index(latest)
+        for i, record in zip(non_empty, latest.to_numpy()):
+            results[i] = TechnicalIndicators._record_to_indicators(record, colidx)
+
+        return results
 
     @staticmethod
     def format_as_text(stock_id: str, stock_name: str, indicators: dict) -> str:
@@ -114,23 +431,44 @@ class TechnicalIndicators:
         Returns:
             Formatted text description
         """
-        lines = [
-            f"股票代碼：{stock_id}",
-            f"公司名稱：{stock_name}",
-            f"日期：{indicators.get('date', 'N/A')}",
-            f"收盤價：{indicators.get('close', 0):.2f}元",
-            f"漲跌幅：{indicators.get('price_change', 0):+.2f}%",
-            f"成交量：{indicators.get('volume', 0):,}張",
-            "",
-            "技術指標：",
-            f"- MA5：{indicators.get('ma5', 0):.2f}",
-            f"- MA20：{indicators.get('ma20', 0):.2f}",
-            f"- MA60：{indicators.get('ma60', 0):.2f}",
-            f"- RSI(14)：{indicators.get('rsi', 0):.2f}",
-            f"- MACD：{indicators.get('macd', 0):.4f}",
-            f"- MACD訊號：{indicators.get('macd_signal', 0):.4f}",
-            f"- KD指標：K={indicators.get('k', 0):.2f}, D={indicators.get('d', 0):.2f}",
-            f"- 布林通道：上軌{indicators.get('bb_high', 0):.2f}, 下軌{indicators.get('bb_low', 0):.2f}",
-        ]
+        values = {
+            'stock_id': stock_id,
+            'stock_name': stock_name,
+            'date': indicators.get('date', 'N/A'),
+        }
+        for key, cast, spec, unit in _TEXT_FIELDS:
+            values[key] = _format_value(indicators.get(key, 0), cast, spec, unit)
+        return _TEXT_TMPL.format_map(values)
+
+    @staticmethod
+    def format_batch(stock_id: str, stock_name: str, df: pd.DataFrame) -> list[str]:
+        """
+        Format every row of an indicator DataFrame as text in one pass.
+
+        Gives the same text as format_as_text on each row's indicators.
+
+        Args:
+            stock_id: Stock code
+            stock_name: Stock name
+            df: DataFrame with calculated indicators
 
-        return "\n".join(lines)
+        Returns:
+            One formatted text per row, in row order
+        """
+        n = len(df)
+        formats = {key: fmt for key, *fmt in _TEXT_FIELDS}
+        keys = []
+        columns = []
+        for key, col, default, _ in _LATEST_FIELDS:
+            keys.append(key)
+            values = df[col].tolist() if col in df.columns else [default] * n
+            if key in formats:
+                cast, spec, unit = formats[key]
+                values = [_format_value(value, cast, spec, unit) for value in values]
+            columns.append(values)
+
+        head = {'stock_id': stock_id, 'stock_name': stock_name}
+        return [
+            _TEXT_TMPL.format_map({**head, **dict(zip(keys, row))})
+            for row in zip(*columns)
+        ]
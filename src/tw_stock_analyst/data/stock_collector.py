@@ -1,21 +1,76 @@
 """Taiwan stock data collection using FinMind and twstock."""
 
+import heapq
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from pathlib import Path
+from typing import Iterator, Optional
+import ijson
+import orjson
 import pandas as pd
 import requests
 import twstock
+from diskcache import Cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ..config import settings
 
+# (connect, read) timeout in seconds for FinMind requests
+REQUEST_TIMEOUT = (3, 10)
+
+# On-disk response cache; entries are bucketed by day and expire after one day
+CACHE_DIR = Path.home() / ".cache" / "tw_stock_analyst" / "finmind"
+CACHE_EXPIRE = 86400
+
+# FinMind TaiwanStockPrice field -> OHLCV column
+PRICE_COLUMNS = {
+    'date': 'Date',
+    'open': 'Open',
+    'max': 'High',
+    'min': 'Low',
+    'close': 'Close',
+    'Trading_Volume': 'Volume',
+}
+# Prices stay float64 so stored payload values keep their exact decimals;
+# the indicator kernel takes its own float32 copy
+PRICE_DTYPES = {
+    'Open': 'float64',
+    'High': 'float64',
+    'Low': 'float64',
+    'Close': 'float64',
+    'Volume': 'int64',
+}
+
 
 class TaiwanStockCollector:
     """Collect Taiwan stock market data."""
 
-    def __init__(self, finmind_token: str = ""):
-        """Initialize collector with optional FinMind token."""
+    def __init__(self, finmind_token: str = "", max_workers: int = 8):
+        """
+        Initialize collector with optional FinMind token.
+
+        Args:
+            finmind_token: FinMind API token (optional)
+            max_workers: Number of concurrent requests in collect_many
+        """
         self.finmind_token = finmind_token
         self.api_url = settings.finmind.api_url
+        self.max_workers = max_workers
+
+        # Shared session keeps connections to FinMind alive across requests
+        self.session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+        )
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.cache = Cache(str(CACHE_DIR))
 
     def get_stock_price(
         self,
@@ -39,6 +94,51 @@ class TaiwanStockCollector:
         if not start_date:
             start_date = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
 
+        # Closed trading days never change, so only today's bar is fetched live
+        today = datetime.now().strftime("%Y-%m-%d")
+        if start_date >= today:
+            return self._fetch_stock_price(stock_id, start_date, end_date)
+
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        history_end = min(end_date, yesterday)
+        key = f"TaiwanStockPrice:{stock_id}:{start_date}:{history_end}"
+
+        history = self.cache.get(key)
+        if history is None:
+            history = self._fetch_stock_price(stock_id, start_date, history_end)
+            if not history.empty:
+                self.cache.set(key, history, expire=CACHE_EXPIRE)
+
+        if end_date < today:
+            return history
+
+        live = self._fetch_stock_price(stock_id, today, end_date, fallback=False)
+        if live.empty:
+            return history
+
+        df = pd.concat([history, live], ignore_index=True)
+        # The twstock fallback ignores end_date, so windows can overlap
+        return df.drop_duplicates(subset='Date', keep='last').reset_index(drop=True)
+
+    def _fetch_stock_price(
+        self,
+        stock_id: str,
+        start_date: str,
+        end_date: str,
+        fallback: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Fetch historical stock price data without caching.
+
+        Args:
+            stock_id: Stock code
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            fallback: Fall back to twstock when FinMind returns no data
+
+        Returns:
+            DataFrame with OHLCV data
+        """
         try:
             # Try FinMind API first (more comprehensive data)
             params = {
@@ -50,24 +150,20 @@ class TaiwanStockCollector:
             if self.finmind_token:
                 params["token"] = self.finmind_token
 
-            response = requests.get(self.api_url, params=params)
-            data = response.json()
+            response = self.session.get(self.api_url, params=params, timeout=REQUEST_TIMEOUT)
+            data = orjson.loads(response.content)
 
             if data.get("status") == 200 and data.get("data"):
-                df = pd.DataFrame(data["data"])
-                df = df.rename(columns={
-                    'date': 'Date',
-                    'open': 'Open',
-                    'max': 'High',
-                    'min': 'Low',
-                    'close': 'Close',
-                    'Trading_Volume': 'Volume'
-                })
-                return df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+                df = pd.DataFrame.from_records(data["data"], columns=list(PRICE_COLUMNS))
+                df = df.rename(columns=PRICE_COLUMNS)
+                return df.astype(PRICE_DTYPES, copy=False)
 
         except Exception as e:
             print(f"FinMind API failed: {e}, falling back to twstock")
 
+        if not fallback:
+            return pd.DataFrame()
+
         # Fallback to twstock
         stock = twstock.Stock(stock_id)
         data = stock.fetch_from(
@@ -75,16 +171,69 @@ class TaiwanStockCollector:
             int(start_date[5:7])
         )
 
-        df = pd.DataFrame([{
-            'Date': d.date.strftime('%Y-%m-%d'),
-            'Open': d.open,
-            'High': d.high,
-            'Low': d.low,
-            'Close': d.close,
-            'Volume': d.capacity
-        } for d in data])
+        # Build columns directly instead of one dict per row. Dates stay as
+        # YYYY-MM-DD strings to match the FinMind path (used as payload keys).
+        n = len(data)
+        dates = [""] * n
+        opens = [0.0] * n
+        highs = [0.0] * n
+        lows = [0.0] * n
+        closes = [0.0] * n
+        volumes = [0] * n
+        for i, d in enumerate(data):
+            dates[i] = d.date.strftime('%Y-%m-%d')
+            opens[i] = d.open
+            highs[i] = d.high
+            lows[i] = d.low
+            closes[i] = d.close
+            volumes[i] = d.capacity
+
+        df = pd.DataFrame({
+            'Date': dates,
+            'Open': opens,
+            'High': highs,
+            'Low': lows,
+            'Close': closes,
+            'Volume': volumes
+        })
+
+        return df.astype(PRICE_DTYPES, copy=False)
+
+    @contextmanager
+    def collect_many(
+        self,
+        stock_ids: list[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        fundamentals: bool = True,
+    ) -> Iterator[tuple[dict[str, Future], dict[str, Future]]]:
+        """
+        Fetch price data (and fundamentals) for multiple stocks concurrently.
+
+        Requests are network-bound, so they overlap freely in a thread pool
+        that lives as long as the context; callers consume each stock's
+        futures as its data arrives.
 
-        return df
+        Args:
+            stock_ids: List of stock codes
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            fundamentals: Also fetch fundamentals via get_fundamentals
+
+        Yields:
+            Tuple of (stock code -> get_stock_price future,
+            stock code -> get_fundamentals future; empty unless fundamentals)
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            price_futures = {
+                stock_id: executor.submit(self.get_stock_price, stock_id, start_date, end_date)
+                for stock_id in stock_ids
+            }
+            fundamental_futures = {
+                stock_id: executor.submit(self.get_fundamentals, stock_id)
+                for stock_id in stock_ids
+            } if fundamentals else {}
+            yield price_futures, fundamental_futures
 
     def get_fundamentals(self, stock_id: str, num_quarters: int = None) -> list[dict]:
         """
@@ -101,6 +250,27 @@ class TaiwanStockCollector:
         if num_quarters is None:
             num_quarters = settings.data.num_quarters
 
+        today = datetime.now().strftime("%Y-%m-%d")
+        key = f"TaiwanStockFinancialStatements:{stock_id}:{num_quarters}:{today}"
+        fundamentals = self.cache.get(key)
+        if fundamentals is None:
+            fundamentals = self._fetch_fundamentals(stock_id, num_quarters)
+            if fundamentals:
+                self.cache.set(key, fundamentals, expire=CACHE_EXPIRE)
+
+        return fundamentals
+
+    def _fetch_fundamentals(self, stock_id: str, num_quarters: int) -> list[dict]:
+        """
+        Fetch fundamental data without caching.
+
+        Args:
+            stock_id: Stock code
+            num_quarters: Number of recent quarters to return
+
+        Returns:
+            List of dictionaries with fundamental metrics, sorted by date (newest first)
+        """
         try:
             # Calculate years back based on num_quarters (4 quarters = 1 year, with buffer)
             # Formula: at least 2 years, add 1 year for every 4 quarters beyond that
@@ -114,31 +284,32 @@ class TaiwanStockCollector:
             if self.finmind_token:
                 params["token"] = self.finmind_token
 
-            response = requests.get(self.api_url, params=params)
-            data = response.json()
+            # Stream rows and keep only the most recent N quarters in a min-heap
+            # keyed by date, instead of parsing the whole response into a DataFrame
+            newest = []
+            with self.session.get(
+                self.api_url, params=params, timeout=REQUEST_TIMEOUT, stream=True
+            ) as response:
+                response.raw.decode_content = True
+                for seq, row in enumerate(ijson.items(response.raw, 'data.item', use_float=True)):
+                    item = (row.get('date', ''), seq, row)
+                    if len(newest) < num_quarters:
+                        heapq.heappush(newest, item)
+                    else:
+                        heapq.heappushpop(newest, item)
 
-            if data.get("status") == 200 and data.get("data"):
-                df = pd.DataFrame(data["data"])
-                if not df.empty:
-                    # Sort by date descending (newest first) to ensure we get the latest data
-                    df = df.sort_values('date', ascending=False)
-
-                    # Take only the most recent N quarters
-                    recent_df = df.head(num_quarters)
-
-                    # Convert to list of dicts
-                    fundamentals = []
-                    for _, row in recent_df.iterrows():
-                        fundamentals.append({
-                            'stock_id': stock_id,
-                            'date': row.get('date', ''),
-                            'revenue': row.get('revenue', 0),
-                            'operating_income': row.get('OperatingIncome', 0),
-                            'net_income': row.get('NetIncome', 0),
-                            'eps': row.get('eps', 0),
-                        })
-
-                    return fundamentals
+            # Newest first
+            return [
+                {
+                    'stock_id': stock_id,
+                    'date': row.get('date', ''),
+                    'revenue': row.get('revenue', 0),
+                    'operating_income': row.get('OperatingIncome', 0),
+                    'net_income': row.get('NetIncome', 0),
+                    'eps': row.get('eps', 0),
+                }
+                for _, _, row in sorted(newest, reverse=True)
+            ]
 
         except Exception as e:
             print(f"Failed to get fundamentals: {e}")
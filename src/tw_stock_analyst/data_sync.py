@@ -1,18 +1,47 @@
 """Incremental stock data sync"""
 
+import asyncio
 import logging
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
+import pandas as pd
+from qdrant_client.models import PointStruct
+
 from .config import settings
 from .data.stock_collector import TaiwanStockCollector
 from .data.indicators import TechnicalIndicators
 from .data.fundamentals import FundamentalFormatter, get_stock_name
-from .vectordb.qdrant_client import StockVectorDB
+from .vectordb.qdrant_client import StockVectorDB, date_to_days
 from .vectordb.embeddings import EmbeddingModel
 
+# Technical text field -> indicator DataFrame column
+TECH_COLUMNS = {
+    'close': 'Close',
+    'volume': 'Volume',
+    'price_change': 'Price_Change',
+    'ma5': 'MA5',
+    'ma20': 'MA20',
+    'ma60': 'MA60',
+    'rsi': 'RSI',
+    'macd': 'MACD',
+    'macd_signal': 'MACD_Signal',
+    'k': 'K',
+    'd': 'D',
+    'bb_high': 'BB_High',
+    'bb_low': 'BB_Low',
+}
+TECH_DTYPES = {
+    col: 'int64' if col == 'Volume' else 'float64'
+    for col in TECH_COLUMNS.values()
+}
+
+# Extra calendar days of prices fetched before the sync window so the
+# longest indicator (MA60, 60 trading days) is warmed up on the first day
+WARMUP_DAYS = 120
+
 
 def setup_logger(log_file: Optional[str] = None, verbose: bool = False) -> logging.Logger:
     """
@@ -55,47 +84,161 @@ def setup_logger(log_file: Optional[str] = None, verbose: bool = False) -> loggi
     return logger
 
 
-def check_data_exists(
-    vector_db: StockVectorDB,
+def prepare_stock_points(
     stock_id: str,
-    date: str,
-    data_type: str
-) -> bool:
+    df: pd.DataFrame,
+    start_date: str,
+    fundamentals_list: Optional[list[dict]],
+    tech_indicators: TechnicalIndicators,
+    formatter: FundamentalFormatter,
+    vector_db: StockVectorDB,
+    embedding_model: EmbeddingModel,
+    logger: logging.Logger
+) -> tuple[list[tuple[PointStruct, str]], int]:
     """
-    Check if data already exists in vector database.
+    Format and embed one stock's new data.
+
+    Blocking; the async sync runs it in a worker thread once the stock's
+    prefetched data has arrived.
 
     Args:
-        vector_db: Vector database client
         stock_id: Stock code
-        date: Date string (YYYY-MM-DD)
-        data_type: Data type (technical/fundamental)
+        df: OHLCV price data, including WARMUP_DAYS before start_date
+        start_date: First day to sync (YYYY-MM-DD); earlier rows only warm
+            up the indicators
+        fundamentals_list: Quarterly fundamentals (None to skip)
+        tech_indicators: Technical indicator calculator
+        formatter: Fundamental data formatter
+        vector_db: Vector database client
+        embedding_model: Embedding model
+        logger: Logger instance
 
     Returns:
-        True if data exists, False otherwise
+        Tuple of (list of (point, log label), skipped_count)
     """
+    stock_name = get_stock_name(stock_id)
+    logger.info(f"Processing {stock_name} ({stock_id})")
+    skipped = 0
+
+    if df.empty:
+        logger.warning(f"  No price data for {stock_id}")
+        return [], skipped
+
+    # Add technical indicators
+    df = tech_indicators.add_all_indicators(df)
+
+    # Prefetch the keys already stored for this stock in one scroll
     try:
-        # Search for existing data
-        results = vector_db.search(
-            query_vector=[0.0] * vector_db.vector_size,  # Dummy vector
-            limit=1,
-            stock_id=stock_id,
-            data_type=data_type,
-            filter_conditions={
-                "must": [
-                    {"key": "date", "match": {"value": date}}
-                ]
-            }
+        existing = vector_db.get_existing_keys(stock_id)
+    except Exception as e:
+        logger.warning(f"  Failed to fetch existing keys for {stock_id}: {e}")
+        existing = set()
+
+    # Pass 1: format every day and quarter not yet in the database
+    pending = []  # (data_type, date, text, metadata)
+
+    # Select and cast the indicator columns once for all rows of the sync
+    # window; indicators without enough history stay NaN (rendered "N/A")
+    tech = (
+        df.reindex(columns=list(TECH_COLUMNS.values()))
+        .fillna({'Volume': 0})
+        .astype(TECH_DTYPES, copy=False)
+    )
+    tech.insert(0, 'Date', df['Date'])
+    tech = tech[tech['Date'] >= start_date]
+
+    # Drop days already in the database
+    existing_dates = [date for date, data_type in existing if data_type == "technical"]
+    is_new = ~tech['Date'].isin(existing_dates)
+    skipped += int((~is_new).sum())
+    tech = tech[is_new]
+
+    # Format every new day in one pass
+    texts = tech_indicators.format_batch(stock_id, stock_name, tech)
+    # Missing indicators are stored as null in the payload metadata
+    records = (
+        tech.astype(object)
+        .where(tech.notna(), None)
+        .rename(columns={'Date': 'date', **{col: key for key, col in TECH_COLUMNS.items()}})
+        .to_dict("records")
+    )
+    for indicators, text in zip(records, texts):
+        pending.append(("technical", indicators['date'], text, indicators))
+
+    # Fundamental data (multiple quarters per stock)
+    if fundamentals_list:
+        try:
+            logger.info(f"  Found {len(fundamentals_list)} quarters of fundamental data")
+            latest_price = float(df.iloc[-1]['Close'])
+
+            # Collect quarters not yet in the database
+            pending_fundamentals = []
+            for fundamentals in fundamentals_list:
+                fund_date = fundamentals.get('date', '')
+
+                if not fund_date:
+                    logger.warning(f"  Skipping fundamental data with missing date")
+                    continue
+                try:
+                    date_to_days(fund_date)
+                except ValueError:
+                    logger.warning(f"  Skipping fundamental data with invalid date {fund_date}")
+                    continue
+
+                # Check if fundamental data already exists
+                if (fund_date, "fundamental") not in existing:
+                    pending_fundamentals.append(fundamentals)
+                else:
+                    logger.debug(f"  Skipping fundamental {stock_id} {fund_date} (already exists)")
+                    skipped += 1
+
+            fund_texts = formatter.format_many(
+                stock_id, stock_name, pending_fundamentals, latest_price
+            )
+            for fundamentals, fund_text in zip(pending_fundamentals, fund_texts):
+                pending.append(("fundamental", fundamentals['date'], fund_text, fundamentals))
+
+        except Exception as e:
+            logger.warning(f"  Failed to format fundamentals for {stock_id}: {e}")
+
+    if not pending:
+        return [], skipped
+
+    # Pass 2: embed all texts of this stock in one batched call; texts
+    # embedded before (e.g. re-synced days) come from the cache
+    vectors = embedding_model.encode_cached(
+        [text for _, _, text, _ in pending],
+        batch_size=settings.embedding.batch_size,
+        normalize=True
+    )
+
+    # Pass 3: build points; the caller upserts them in batches across stocks.
+    # Values were cleaned and cast column-wise above, so no per-row guard
+    points = [
+        (
+            vector_db.build_point(
+                text=text,
+                vector=vector,
+                stock_id=stock_id,
+                stock_name=stock_name,
+                date=date,
+                data_type=data_type,
+                metadata=metadata
+            ),
+            f"{data_type} data: {stock_id} {date}"
         )
-        return len(results) > 0
-    except Exception:
-        return False
+        for (data_type, date, text, metadata), vector in zip(pending, vectors)
+    ]
+
+    return points, skipped
 
 
 def sync_stock_data(
     stock_ids: Optional[list[str]] = None,
     days_back: int = 2,
     skip_fundamentals: bool = False,
-    logger: Optional[logging.Logger] = None
+    logger: Optional[logging.Logger] = None,
+    bulk: bool = False
 ) -> tuple[int, int]:
     """
     Incrementally sync stock data to vector database.
@@ -105,6 +248,35 @@ def sync_stock_data(
         days_back: Number of days to sync (default: 2)
         skip_fundamentals: Skip fundamental data
         logger: Logger instance
+        bulk: Pause HNSW indexing while loading (for large initial loads)
+
+    Returns:
+        Tuple of (inserted_count, skipped_count)
+    """
+    return asyncio.run(
+        async_sync_stock_data(stock_ids, days_back, skip_fundamentals, logger, bulk)
+    )
+
+
+async def async_sync_stock_data(
+    stock_ids: Optional[list[str]] = None,
+    days_back: int = 2,
+    skip_fundamentals: bool = False,
+    logger: Optional[logging.Logger] = None,
+    bulk: bool = False
+) -> tuple[int, int]:
+    """
+    Async implementation of sync_stock_data.
+
+    Stocks are processed concurrently, at most settings.qdrant.concurrency
+    at a time, and batches are upserted with the async Qdrant client.
+
+    Args:
+        stock_ids: List of stock codes (default: from config)
+        days_back: Number of days to sync (default: 2)
+        skip_fundamentals: Skip fundamental data
+        logger: Logger instance
+        bulk: Pause HNSW indexing while loading (for large initial loads)
 
     Returns:
         Tuple of (inserted_count, skipped_count)
@@ -116,8 +288,11 @@ def sync_stock_data(
     logger.info("Stock data sync started")
     logger.info(f"Days back: {days_back}")
     logger.info(f"Skip fundamentals: {skip_fundamentals}")
+    logger.info(f"Bulk mode: {bulk}")
 
     # Initialize components
+    vector_db = None
+    indexing_threshold = None  # Threshold to restore after a bulk load
     try:
         collector = TaiwanStockCollector(settings.finmind.token)
         formatter = FundamentalFormatter()
@@ -131,8 +306,16 @@ def sync_stock_data(
         vector_size = embedding_model.get_dimension()
         vector_db.create_collection(vector_size)
 
+        # Skip HNSW graph updates during the load; the index is built once
+        # when the collection's own threshold is restored below
+        if bulk:
+            indexing_threshold = vector_db.get_indexing_threshold()
+            vector_db.set_indexing_threshold(0)
+
     except Exception as e:
         logger.error(f"Failed to initialize components: {e}")
+        if vector_db is not None:
+            await vector_db.aclose()
         return 0, 0
 
     # Get stock list
@@ -144,129 +327,87 @@ def sync_stock_data(
     # Date range
     end_date = datetime.now().strftime("%Y-%m-%d")
     start_date = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
+    fetch_start = (datetime.now() - timedelta(days=days_back + WARMUP_DAYS)).strftime("%Y-%m-%d")
 
     logger.info(f"Date range: {start_date} to {end_date}")
 
     total_inserted = 0
     total_skipped = 0
 
-    # Process each stock
-    for stock_id in stock_ids:
-        stock_name = get_stock_name(stock_id)
-        logger.info(f"Processing {stock_name} ({stock_id})")
-
-        try:
-            # Get price data
-            df = collector.get_stock_price(stock_id, start_date, end_date)
-
-            if df.empty:
-                logger.warning(f"  No price data for {stock_id}")
-                continue
-
-            # Add technical indicators
-            df = tech_indicators.add_all_indicators(df)
-
-            # Process each day
-            for _, row in df.iterrows():
-                date = row['Date']
-
-                # Check if technical data already exists
-                if check_data_exists(vector_db, stock_id, date, "technical"):
-                    logger.debug(f"  Skipping {stock_id} {date} (already exists)")
-                    total_skipped += 1
-                    continue
-
+    # Points waiting to be upserted, with a label for logging
+    batch = []
+    semaphore = asyncio.Semaphore(settings.qdrant.concurrency)
+
+    async def flush_batch() -> None:
+        """Upsert all queued points, at most settings.qdrant.batch_size per request."""
+        nonlocal total_inserted
+        if not batch:
+            return
+        # Take the queue before awaiting so other stocks can keep appending
+        queued = batch[:]
+        batch.clear()
+        size = settings.qdrant.batch_size
+        for start in range(0, len(queued), size):
+            points = queued[start:start + size]
+            try:
+                await vector_db.ainsert_stock_data_batch([point for point, _ in points])
+                total_inserted += len(points)
+                for _, label in points:
+                    logger.info(f"  Inserted {label}")
+            except Exception as e:
+                logger.error(f"  Failed to insert batch of {len(points)} points: {e}")
+
+    async def process_stock(stock_id: str) -> None:
+        """Prepare one stock in a worker thread and queue its points."""
+        nonlocal total_skipped
+        async with semaphore:
+            try:
+                df = await asyncio.wrap_future(price_futures[stock_id])
+            except Exception as e:
+                logger.error(f"  Failed to get price data for {stock_id}: {e}")
+                return
+
+            fundamentals_list = None
+            if stock_id in fundamental_futures:
                 try:
-                    indicators = {
-                        'date': date,
-                        'close': float(row.get('Close', 0)),
-                        'volume': int(row.get('Volume', 0)),
-                        'price_change': float(row.get('Price_Change', 0)),
-                        'ma5': float(row.get('MA5', 0)),
-                        'ma20': float(row.get('MA20', 0)),
-                        'ma60': float(row.get('MA60', 0)),
-                        'rsi': float(row.get('RSI', 0)),
-                        'macd': float(row.get('MACD', 0)),
-                        'macd_signal': float(row.get('MACD_Signal', 0)),
-                        'k': float(row.get('K', 0)),
-                        'd': float(row.get('D', 0)),
-                        'bb_high': float(row.get('BB_High', 0)),
-                        'bb_low': float(row.get('BB_Low', 0)),
-                    }
-
-                    # Format as text
-                    text = tech_indicators.format_as_text(
-                        stock_id, stock_name, indicators
-                    )
-
-                    # Generate embedding
-                    vector = embedding_model.encode(text).tolist()
-
-                    # Insert into vector DB
-                    vector_db.insert_stock_data(
-                        text=text,
-                        vector=vector,
-                        stock_id=stock_id,
-                        stock_name=stock_name,
-                        date=date,
-                        data_type="technical",
-                        metadata=indicators
+                    fundamentals_list = await asyncio.wrap_future(
+                        fundamental_futures[stock_id]
                     )
-
-                    total_inserted += 1
-                    logger.info(f"  Inserted technical data: {stock_id} {date}")
-
-                except Exception as e:
-                    logger.error(f"  Failed to insert technical data {stock_id} {date}: {e}")
-                    continue
-
-            # Sync fundamental data (multiple quarters per stock)
-            if not skip_fundamentals:
-                try:
-                    fundamentals_list = collector.get_fundamentals(stock_id)
-
-                    if fundamentals_list:
-                        logger.info(f"  Found {len(fundamentals_list)} quarters of fundamental data")
-                        latest_price = float(df.iloc[-1]['Close'])
-
-                        # Process each quarter's data
-                        for fundamentals in fundamentals_list:
-                            fund_date = fundamentals.get('date', '')
-
-                            if not fund_date:
-                                logger.warning(f"  Skipping fundamental data with missing date")
-                                continue
-
-                            # Check if fundamental data already exists
-                            if not check_data_exists(vector_db, stock_id, fund_date, "fundamental"):
-                                fund_text = formatter.format_as_text(
-                                    stock_id, stock_name, fundamentals, latest_price
-                                )
-
-                                fund_vector = embedding_model.encode(fund_text).tolist()
-
-                                vector_db.insert_stock_data(
-                                    text=fund_text,
-                                    vector=fund_vector,
-                                    stock_id=stock_id,
-                                    stock_name=stock_name,
-                                    date=fund_date,
-                                    data_type="fundamental",
-                                    metadata=fundamentals
-                                )
-
-                                total_inserted += 1
-                                logger.info(f"  Inserted fundamental data: {stock_id} {fund_date}")
-                            else:
-                                logger.debug(f"  Skipping fundamental {stock_id} {fund_date} (already exists)")
-                                total_skipped += 1
-
                 except Exception as e:
                     logger.warning(f"  Failed to get fundamentals for {stock_id}: {e}")
 
-        except Exception as e:
-            logger.error(f"  Failed to process {stock_id}: {e}")
-            continue
+            try:
+                points, skipped = await asyncio.to_thread(
+                    prepare_stock_points,
+                    stock_id, df, start_date, fundamentals_list,
+                    tech_indicators, formatter,
+                    vector_db, embedding_model, logger
+                )
+            except Exception as e:
+                logger.error(f"  Failed to process {stock_id}: {e}")
+                return
+
+            total_skipped += skipped
+            batch.extend(points)
+            if len(batch) >= settings.qdrant.batch_size:
+                await flush_batch()
+
+    try:
+        # Prefetch prices and fundamentals of every stock up front
+        with collector.collect_many(
+            stock_ids, fetch_start, end_date, fundamentals=not skip_fundamentals
+        ) as (price_futures, fundamental_futures):
+            # Process stocks concurrently as their data arrives
+            await asyncio.gather(*(process_stock(stock_id) for stock_id in stock_ids))
+
+        await flush_batch()
+    finally:
+        if indexing_threshold is not None:
+            try:
+                vector_db.set_indexing_threshold(indexing_threshold)
+            except Exception as e:
+                logger.error(f"Failed to re-enable indexing: {e}")
+        await vector_db.aclose()
 
     # Summary
     logger.info("=" * 50)
@@ -304,6 +445,11 @@ def main():
         action="store_true",
         help="跳過財報資料"
     )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="大量載入時暫停 HNSW 索引，完成後再一次建立"
+    )
     parser.add_argument(
         "--log-file",
         type=str,
@@ -325,7 +471,8 @@ def main():
             stock_ids=args.stocks,
             days_back=args.days,
             skip_fundamentals=args.skip_fundamentals,
-            logger=logger
+            logger=logger,
+            bulk=args.bulk
         )
 
         if args.verbose:
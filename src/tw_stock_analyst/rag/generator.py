@@ -1,7 +1,21 @@
 """RAG generator using local model via Ollama."""
 
+import time
 import ollama
-from typing import Optional
+from typing import AsyncIterator, Iterator, Optional, Union
+
+from ..config import settings
+
+DEFAULT_SYSTEM_PROMPT = """你是一個專業的台灣股市分析助手。
+請根據提供的歷史資料和技術指標，提供專業、客觀的分析和建議。
+注意：
+1. 僅根據提供的資料進行分析
+2. 說明你的分析依據
+3. 避免過度承諾或保證
+4. 提醒投資風險"""
+
+# Seconds a check_model_available result is reused
+MODEL_CHECK_TTL = 60.0
 
 
 class StockAnalysisGenerator:
@@ -10,74 +24,168 @@ class StockAnalysisGenerator:
     def __init__(
         self,
         model_name: str = "deepseek-r1:1.5b",
-        ollama_host: Optional[str] = None
+        ollama_host: Optional[str] = None,
+        num_ctx: Optional[int] = None,
+        num_keep: Optional[int] = None
     ):
         """
         Initialize generator.
 
         Args:
             model_name: Ollama model name
-            ollama_host: Ollama server URL (optional)
+            ollama_host: Ollama server URL (default: from config)
+            num_ctx: Context window size in tokens (default: from config)
+            num_keep: Tokens kept from the start of the context when the
+                window shifts, i.e. the system prompt (default: from config,
+                unset leaves Ollama's default)
         """
         self.model_name = model_name
-        if ollama_host:
-            ollama.client = ollama.Client(host=ollama_host)
+        if ollama_host is None:
+            ollama_host = settings.ollama.host
 
-    def generate(
+        # One client per generator keeps its HTTP connections pooled
+        self.client = ollama.Client(host=ollama_host)
+        self.async_client = ollama.AsyncClient(host=ollama_host)
+
+        if num_keep is None:
+            num_keep = settings.ollama.num_keep
+
+        self.options = {
+            "num_ctx": num_ctx if num_ctx is not None else settings.ollama.num_ctx,
+        }
+        if num_keep is not None:
+            self.options["num_keep"] = num_keep
+
+        # (expires_at, available) of the last successful model check
+        self._model_check: Optional[tuple[float, bool]] = None
+
+    def _build_request(
+        self,
+        query: str,
+        context: str,
+        system_prompt: Optional[str]
+    ) -> dict:
+        """Build the streaming generate request of a RAG query."""
+        if system_prompt is None:
+            system_prompt = DEFAULT_SYSTEM_PROMPT
+
+        # Construct prompt
+        full_prompt = f"""參考資料：
+{context}
+
+用戶問題：
+{query}
+
+請基於以上資料回答問題。"""
+
+        return {
+            "model": self.model_name,
+            "prompt": full_prompt,
+            # The system prompt leads every request, so Ollama reuses its
+            # cached KV prefix instead of evaluating it again
+            "system": system_prompt,
+            "options": self.options,
+            "stream": True,
+        }
+
+    def _error_message(self, e: Exception) -> str:
+        """Error text shown in place of an answer."""
+        return f"生成回答時發生錯誤：{str(e)}\n\n請確認 Ollama 已啟動且已下載 {self.model_name} 模型。"
+
+    def generate_stream(
         self,
         query: str,
         context: str,
         system_prompt: Optional[str] = None
-    ) -> str:
+    ) -> Iterator[str]:
         """
-        Generate response using RAG.
+        Generate response using RAG, yielding text chunks as they arrive.
 
         Args:
             query: User query
             context: Retrieved context from vector DB
             system_prompt: System prompt (optional)
 
-        Returns:
-            Generated response
+        Yields:
+            Generated response chunks
         """
-        if system_prompt is None:
-            system_prompt = """你是一個專業的台灣股市分析助手。
-請根據提供的歷史資料和技術指標，提供專業、客觀的分析和建議。
-注意：
-1. 僅根據提供的資料進行分析
-2. 說明你的分析依據
-3. 避免過度承諾或保證
-4. 提醒投資風險"""
+        try:
+            stream = self.client.generate(**self._build_request(query, context, system_prompt))
 
-        # Construct prompt
-        full_prompt = f"""參考資料：
-{context}
+            for chunk in stream:
+                text = chunk.get('response')
+                if text:
+                    yield text
 
-用戶問題：
-{query}
+        except Exception as e:
+            yield self._error_message(e)
 
-請基於以上資料回答問題。"""
+    async def agenerate_stream(
+        self,
+        query: str,
+        context: str,
+        system_prompt: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Async variant of generate_stream, e.g. for serving chunks over SSE.
 
+        Args:
+            query: User query
+            context: Retrieved context from vector DB
+            system_prompt: System prompt (optional)
+
+        Yields:
+            Generated response chunks
+        """
         try:
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": full_prompt}
-                ]
+            stream = await self.async_client.generate(
+                **self._build_request(query, context, system_prompt)
             )
 
-            return response['message']['content']
+            async for chunk in stream:
+                text = chunk.get('response')
+                if text:
+                    yield text
 
         except Exception as e:
-            return f"生成回答時發生錯誤：{str(e)}\n\n請確認 Ollama 已啟動且已下載 {self.model_name} 模型。"
+            yield self._error_message(e)
+
+    def generate(
+        self,
+        query: str,
+        context: str,
+        system_prompt: Optional[str] = None,
+        stream: bool = False
+    ) -> Union[str, Iterator[str]]:
+        """
+        Generate response using RAG.
+
+        Args:
+            query: User query
+            context: Retrieved context from vector DB
+            system_prompt: System prompt (optional)
+            stream: Return an iterator of chunks instead of the full text
+
+        Returns:
+            Generated response, or an iterator of its chunks when streaming
+        """
+        chunks = self.generate_stream(query, context, system_prompt)
+        if stream:
+            return chunks
+        return "".join(chunks)
 
     def check_model_available(self) -> bool:
-        """Check if the model is available in Ollama."""
+        """Check if the model is available in Ollama (cached for MODEL_CHECK_TTL seconds)."""
+        now = time.monotonic()
+        if self._model_check is not None and now < self._model_check[0]:
+            return self._model_check[1]
+
         try:
-            models = ollama.list()
+            models = self.client.list()
             model_names = [m.model for m in models.models]
-            return any(self.model_name in name for name in model_names)
+            available = any(self.model_name in name for name in model_names)
+            self._model_check = (now + MODEL_CHECK_TTL, available)
+            return available
         except Exception as e:
             print(f"Error checking model availability: {e}")
             return False
@@ -1,17 +1,71 @@
 """RAG retriever for stock analysis."""
 
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 from ..vectordb.qdrant_client import StockVectorDB
 from ..vectordb.embeddings import EmbeddingModel
 
 
+class QueryCache:
+    """Thread-safe LRU cache with per-entry TTL for query embeddings."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        """
+        Initialize cache.
+
+        Args:
+            maxsize: Maximum number of cached entries
+            ttl: Time-to-live of each entry in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[list[float]]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                self.stats["misses"] += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value: list[float]) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+
 class StockRetriever:
     """Retrieve relevant stock information from vector database."""
 
     def __init__(
         self,
         vector_db: StockVectorDB,
-        embedding_model: EmbeddingModel
+        embedding_model: EmbeddingModel,
+        query_cache: Optional[QueryCache] = None
     ):
         """
         Initialize retriever.
@@ -19,16 +73,59 @@ class StockRetriever:
         Args:
             vector_db: Vector database client
             embedding_model: Embedding model for queries
+            query_cache: Cache for query embeddings (default: 1024 entries, 300s TTL)
         """
         self.vector_db = vector_db
         self.embedding_model = embedding_model
+        self.query_cache = query_cache if query_cache is not None else QueryCache()
+
+    def encode_query(self, query: str) -> list[float]:
+        """
+        Get the embedding of a query, reusing cached vectors for repeated queries.
+
+        Args:
+            query: User query text
+
+        Returns:
+            Query embedding vector
+        """
+        key = query.strip()
+        query_vector = self.query_cache.get(key)
+        if query_vector is None:
+            query_vector = self.embedding_model.encode(key).tolist()
+            self.query_cache.set(key, query_vector)
+        return query_vector
+
+    def encode_queries(self, queries: list[str]) -> list[list[float]]:
+        """
+        Get the embeddings of many queries, encoding all uncached ones at once.
+
+        Args:
+            queries: User query texts
+
+        Returns:
+            Query embedding vectors, in input order
+        """
+        keys = [query.strip() for query in queries]
+        vectors = [self.query_cache.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = self.embedding_model.encode([keys[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector.tolist()
+                self.query_cache.set(keys[i], vectors[i])
+
+        return vectors
 
     def retrieve(
         self,
         query: str,
         top_k: int = 5,
         stock_id: Optional[str] = None,
-        data_type: Optional[str] = None
+        data_type: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
     ) -> list[dict]:
         """
         Retrieve relevant documents for a query.
@@ -38,23 +135,61 @@ class StockRetriever:
             top_k: Number of documents to retrieve
             stock_id: Filter by stock ID (optional)
             data_type: Filter by data type (optional)
+            start_date: Filter by earliest date, YYYY-MM-DD (optional)
+            end_date: Filter by latest date, YYYY-MM-DD (optional)
 
         Returns:
             List of retrieved documents with scores
         """
         # Generate query embedding
-        query_vector = self.embedding_model.encode(query).tolist()
+        query_vector = self.encode_query(query)
 
         # Search vector database
         results = self.vector_db.search(
             query_vector=query_vector,
             limit=top_k,
             stock_id=stock_id,
-            data_type=data_type
+            data_type=data_type,
+            start_date=start_date,
+            end_date=end_date
         )
 
         return results
 
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        stock_id: Optional[str] = None,
+        data_type: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> list[list[dict]]:
+        """
+        Retrieve relevant documents for many queries with one search request.
+
+        Args:
+            queries: User query texts
+            top_k: Number of documents to retrieve per query
+            stock_id: Filter by stock ID (optional)
+            data_type: Filter by data type (optional)
+            start_date: Filter by earliest date, YYYY-MM-DD (optional)
+            end_date: Filter by latest date, YYYY-MM-DD (optional)
+
+        Returns:
+            One list of retrieved documents per query, in input order
+        """
+        query_vectors = self.encode_queries(queries)
+
+        return self.vector_db.search_batch(
+            query_vectors=query_vectors,
+            limit=top_k,
+            stock_id=stock_id,
+            data_type=data_type,
+            start_date=start_date,
+            end_date=end_date
+        )
+
     def format_context(self, results: list[dict]) -> str:
         """
         Format retrieved results into context for LLM.
@@ -1,36 +1,310 @@
 """Embedding generation using Sentence Transformers."""
 
-from typing import Union
-from sentence_transformers import SentenceTransformer
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Union
 import numpy as np
+import xxhash
+from diskcache import Cache
+
+from ..config import settings
+
+ONNX_CACHE_DIR = Path.home() / ".cache" / "tw_stock_analyst" / "onnx"
+EMBEDDING_CACHE_DIR = Path.home() / ".cache" / "tw_stock_analyst" / "embeddings"
+OPENVINO_INT8_FILE = "openvino/openvino_model_qint8_quantized.xml"
+
+
+def ensure_quantized_onnx_model(
+    model_name: str,
+    quantization: str,
+    cache_dir: Path = ONNX_CACHE_DIR
+) -> tuple[str, str]:
+    """
+    Export a dynamically quantized (int8) ONNX model once.
+
+    Args:
+        model_name: Name of the sentence transformer model
+        quantization: Quantization config (e.g. "avx512_vnni", "avx2", "arm64")
+        cache_dir: Directory where exported models are stored
+
+    Returns:
+        Tuple of (local model directory, ONNX file name inside it)
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model_dir = cache_dir / model_name.replace("/", "--")
+    file_name = f"onnx/model_qint8_{quantization}.onnx"
+
+    if not (model_dir / file_name).exists():
+        print(f"Exporting int8 ONNX model ({quantization}) to {model_dir}")
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save_pretrained(str(model_dir))
+        export_dynamic_quantized_onnx_model(model, quantization, str(model_dir))
+
+    return str(model_dir), file_name
+
+
+def ensure_quantized_openvino_model(
+    model_name: str,
+    cache_dir: Path = ONNX_CACHE_DIR
+) -> tuple[str, str]:
+    """
+    Export a statically quantized (int8) OpenVINO model once.
+
+    Static quantization calibrates activations on a sample dataset
+    (sentence-transformers' default), so the first export downloads it.
+
+    Args:
+        model_name: Name of the sentence transformer model
+        cache_dir: Directory where exported models are stored
+
+    Returns:
+        Tuple of (local model directory, OpenVINO file name inside it)
+    """
+    from sentence_transformers import SentenceTransformer, export_static_quantized_openvino_model
+
+    model_dir = cache_dir / model_name.replace("/", "--")
+
+    if not (model_dir / OPENVINO_INT8_FILE).exists():
+        print(f"Exporting int8 OpenVINO model to {model_dir}")
+        model = SentenceTransformer(model_name, backend="openvino")
+        model.save_pretrained(str(model_dir))
+        export_static_quantized_openvino_model(model, None, str(model_dir))
+
+    return str(model_dir), OPENVINO_INT8_FILE
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by a hash of the text."""
+
+    def __init__(self, namespace: str = "", cache_dir: Path = EMBEDDING_CACHE_DIR):
+        """
+        Initialize cache.
+
+        Args:
+            namespace: Identifies the model producing the vectors, so
+                different models never share entries
+            cache_dir: Directory of the cache
+        """
+        self.namespace = namespace
+        self._cache = Cache(str(cache_dir))
+
+    def _key(self, text: str, normalize: bool) -> str:
+        """Content-addressed key of a text."""
+        return f"{self.namespace}:{int(normalize)}:{xxhash.xxh3_128_hexdigest(text.encode("utf-8"))}"
+
+    def get(self, text: str, normalize: bool = False) -> Optional[np.ndarray]:
+        """Return the cached float32 vector, or None if missing."""
+        raw = self._cache.get(self._key(text, normalize))
+        if raw is None:
+            return None
+        return np.frombuffer(raw, dtype=np.float32)
+
+    def set(self, text: str, vector: np.ndarray, normalize: bool = False) -> None:
+        """Store a vector as float32 bytes."""
+        self._cache.set(
+            self._key(text, normalize),
+            np.asarray(vector, dtype=np.float32).tobytes()
+        )
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._cache.clear()
+
+
+def select_device(device: str = "auto") -> str:
+    """
+    Resolve the torch device for the embedding model.
+
+    Args:
+        device: "auto", "cpu", "cuda" or "mps"; "auto" picks CUDA, then
+            Apple MPS, then CPU
+
+    Returns:
+        Torch device name
+    """
+    if device != "auto":
+        return device
+
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
 
 
 class EmbeddingModel:
     """Wrapper for sentence transformer embedding model."""
 
-    def __init__(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"):
+    def __init__(
+        self,
+        model_name: str = "paraphrase-multilingual-MiniLM-L12-v2",
+        backend: Optional[str] = None,
+        quantization: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None
+    ):
         """
         Initialize embedding model.
 
         Args:
             model_name: Name of the sentence transformer model
+            backend: Inference backend, "onnx", "openvino" or "torch"
+                (default: from config)
+            quantization: int8 quantization config for ONNX (e.g. "avx512_vnni");
+                any non-empty value enables int8 for OpenVINO; empty to disable
+                (default: from config)
+            cache: Cache used by encode_cached (default: on-disk cache
+                under ~/.cache/tw_stock_analyst, created on first use)
         """
-        print(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        # Imported here: sentence-transformers pulls in torch at import time
+        from sentence_transformers import SentenceTransformer
+
+        if backend is None:
+            backend = settings.embedding.backend
+        if quantization is None:
+            quantization = settings.embedding.quantization
+
+        self.backend = backend
+        self._cache = cache
+        # Sync prepares several stocks in worker threads; inference is
+        # serialized because OpenVINO shares one infer request and torch
+        # already uses every core per call
+        self._lock = threading.Lock()
+        self._cache_namespace = f"{model_name}:{backend}:{quantization}"
+
+        print(f"Loading embedding model: {model_name} (backend: {backend})")
+        if backend == "onnx" and quantization:
+            model_dir, file_name = ensure_quantized_onnx_model(model_name, quantization)
+            self.model = SentenceTransformer(
+                model_dir,
+                backend="onnx",
+                model_kwargs={"file_name": file_name}
+            )
+        elif backend == "openvino" and quantization:
+            model_dir, file_name = ensure_quantized_openvino_model(model_name)
+            self.model = SentenceTransformer(
+                model_dir,
+                backend="openvino",
+                model_kwargs={"file_name": file_name}
+            )
+        elif backend == "torch":
+            device = select_device(settings.embedding.device)
+            print(f"Embedding device: {device}")
+            self.model = SentenceTransformer(model_name, backend=backend, device=device)
+        else:
+            self.model = SentenceTransformer(model_name, backend=backend)
+
+        if backend == "torch":
+            import torch
+
+            # torch may start with fewer intra-op threads than cores
+            torch.set_num_threads(settings.embedding.threads or os.cpu_count())
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass  # Can only be set before the first inter-op parallel work
+            torch.set_float32_matmul_precision("high")
+
         self.dimension = self.model.get_sentence_embedding_dimension()
         print(f"Model loaded. Embedding dimension: {self.dimension}")
 
-    def encode(self, text: Union[str, list[str]]) -> np.ndarray:
+    def encode(
+        self,
+        text: Union[str, list[str]],
+        batch_size: int = 32,
+        normalize: bool = False
+    ) -> np.ndarray:
         """
         Generate embeddings for text.
 
         Args:
             text: Single text string or list of texts
+            batch_size: Number of texts per forward pass when encoding a list
+            normalize: L2-normalize the embeddings
 
         Returns:
             Embedding vector(s) as numpy array
         """
-        embeddings = self.model.encode(text, convert_to_numpy=True)
+        # ONNX/OpenVINO models always run on the CPU here
+        on_gpu = self.backend == "torch" and self.model.device.type != "cpu"
+
+        def run() -> np.ndarray:
+            if not on_gpu:
+                return self.model.encode(
+                    text,
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    normalize_embeddings=normalize,
+                    show_progress_bar=False
+                )
+
+            # Keep batch outputs on the device and copy to host once;
+            # larger batches keep the GPU busy
+            embeddings = self.model.encode(
+                text,
+                batch_size=max(batch_size, settings.embedding.gpu_batch_size),
+                convert_to_tensor=True,
+                normalize_embeddings=normalize,
+                show_progress_bar=False
+            )
+            return embeddings.float().cpu().numpy()
+
+        with self._lock:
+            if self.backend != "torch":
+                return run()
+
+            import torch
+
+            # bf16 autocast only on CPU; GPU devices keep their default precision
+            use_bf16 = settings.embedding.bf16 and self.model.device.type == "cpu"
+            with torch.inference_mode(), torch.autocast("cpu", dtype=torch.bfloat16, enabled=use_bf16):
+                return run()
+
+    def encode_cached(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        normalize: bool = False
+    ) -> np.ndarray:
+        """
+        Generate embeddings, reusing cached vectors of previously seen texts.
+
+        Only texts missing from the cache are encoded, in a single batch.
+
+        Args:
+            texts: List of texts
+            batch_size: Number of texts per forward pass
+            normalize: L2-normalize the embeddings
+
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+        with self._lock:
+            if self._cache is None:
+                self._cache = EmbeddingCache(self._cache_namespace)
+
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        missing = []
+        for i, text in enumerate(texts):
+            vector = self._cache.get(text, normalize)
+            if vector is None:
+                missing.append(i)
+            else:
+                embeddings[i] = vector
+
+        if missing:
+            vectors = self.encode(
+                [texts[i] for i in missing],
+                batch_size=batch_size,
+                normalize=normalize
+            )
+            for i, vector in zip(missing, vectors):
+                embeddings[i] = vector
+                self._cache.set(texts[i], vector, normalize)
+
         return embeddings
 
     def get_dimension(self) -> int:
@@ -1,29 +1,68 @@
 """Qdrant vector database client."""
 
-from typing import Optional
-from qdrant_client import QdrantClient
+from datetime import date as Date
+from typing import Optional, Union
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.models import (
     Distance,
     VectorParams,
     PointStruct,
     Filter,
     FieldCondition,
+    IsEmptyCondition,
+    PayloadField,
     MatchValue,
+    Range,
+    PayloadSchemaType,
+    IntegerIndexParams,
+    IntegerIndexType,
+    OptimizersConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    SearchParams,
+    QueryRequest,
+    QuantizationSearchParams,
 )
-import hashlib
-import uuid
+import numpy as np
+import xxhash
 
 from ..config import settings
 
+_EPOCH = Date(1970, 1, 1)
+
+# Qdrant's default: segments larger than this many KB get an HNSW index.
+# Used when a collection does not report its own threshold.
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+
+def date_to_days(date: str) -> int:
+    """
+    Convert an ISO date string to days since the Unix epoch.
+
+    Args:
+        date: Date string (YYYY-MM-DD)
+
+    Returns:
+        Number of days since 1970-01-01
+    """
+    return (Date.fromisoformat(date[:10]) - _EPOCH).days
+
 
 class StockVectorDB:
     """Qdrant client for stock analysis data."""
 
+    # Embedding dimension; overridden per instance by create_collection
+    vector_size: int = settings.embedding.vector_size
+
     def __init__(
         self,
         host: Optional[str] = None,
         port: Optional[int] = None,
-        collection_name: Optional[str] = None
+        collection_name: Optional[str] = None,
+        prefer_grpc: Optional[bool] = None
     ):
         """
         Initialize Qdrant client.
@@ -32,6 +71,7 @@ class StockVectorDB:
             host: Qdrant server host (default: from config)
             port: Qdrant server port (default: from config)
             collection_name: Name of the collection (default: from config)
+            prefer_grpc: Talk to Qdrant over gRPC (default: from config)
         """
         # Use config values as defaults
         if host is None:
@@ -40,10 +80,63 @@ class StockVectorDB:
             port = settings.qdrant.port
         if collection_name is None:
             collection_name = settings.qdrant.collection_name
+        if prefer_grpc is None:
+            prefer_grpc = settings.qdrant.prefer_grpc
 
-        self.client = QdrantClient(host=host, port=port)
+        client_kwargs = {
+            "host": host,
+            "port": port,
+            "grpc_port": settings.qdrant.grpc_port,
+            "prefer_grpc": prefer_grpc,
+        }
+        self.client = QdrantClient(**client_kwargs)
+        self._client_kwargs = client_kwargs
+        self._aclient: Optional[AsyncQdrantClient] = None
         self.collection_name = collection_name
-        self.vector_size = None  # Will be set when collection is created
+        self._collection_ready = False  # Set once the collection is known to exist
+
+    @property
+    def aclient(self) -> AsyncQdrantClient:
+        """Async client, created on first use (only the async sync path needs it)."""
+        if self._aclient is None:
+            self._aclient = AsyncQdrantClient(**self._client_kwargs)
+        return self._aclient
+
+    async def aclose(self) -> None:
+        """Close the async client if it was created."""
+        if self._aclient is not None:
+            await self._aclient.close()
+            self._aclient = None
+
+    @staticmethod
+    def make_quantization_config(
+        quantization: str
+    ) -> Optional[Union[ScalarQuantization, BinaryQuantization]]:
+        """
+        Build the quantization config of a new collection.
+
+        Quantized copies of the vectors are kept in RAM for candidate
+        scoring; search rescores candidates with the original vectors.
+
+        Args:
+            quantization: "scalar" (int8), "binary" (1 bit) or "none"
+
+        Returns:
+            Quantization config, or None when disabled
+        """
+        if quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=True
+                )
+            )
+        if quantization == "binary":
+            return BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=True)
+            )
+        return None
 
     def create_collection(self, vector_size: int = 384) -> bool:
         """
@@ -58,41 +151,200 @@ class StockVectorDB:
         try:
             self.vector_size = vector_size  # Store vector size
 
-            collections = self.client.get_collections().collections
-            if any(col.name == self.collection_name for col in collections):
+            if self._collection_ready:
+                return True
+
+            if self.client.collection_exists(self.collection_name):
                 print(f"Collection '{self.collection_name}' already exists")
+                self.create_payload_indexes()
+                self._collection_ready = True
                 return True
 
             self.client.create_collection(
                 collection_name=self.collection_name,
                 vectors_config=VectorParams(
                     size=vector_size,
-                    distance=Distance.COSINE
+                    distance=Distance.COSINE,
+                    on_disk=settings.qdrant.on_disk
+                ),
+                quantization_config=self.make_quantization_config(
+                    settings.qdrant.quantization
                 ),
             )
             print(f"Collection '{self.collection_name}' created successfully")
+            self.create_payload_indexes()
+            self._collection_ready = True
             return True
 
         except Exception as e:
             print(f"Error creating collection: {e}")
             return False
 
-    def insert_stock_data(
+    def get_indexing_threshold(self) -> int:
+        """
+        Get the collection's current HNSW indexing threshold.
+
+        Returns:
+            Indexing threshold in KB (DEFAULT_INDEXING_THRESHOLD if unset or 0)
+        """
+        info = self.client.get_collection(collection_name=self.collection_name)
+        threshold = info.config.optimizer_config.indexing_threshold
+        # 0 is left behind by a bulk load killed before its restore ran;
+        # restoring it would keep indexing disabled for good
+        return threshold or DEFAULT_INDEXING_THRESHOLD
+
+    def set_indexing_threshold(self, threshold: int) -> None:
+        """
+        Set the segment size above which Qdrant builds HNSW indexes.
+
+        Bulk loads set 0 to skip graph updates on every insert, then restore
+        the previous threshold so the index is built once at the end.
+
+        Args:
+            threshold: Indexing threshold in KB (0 disables indexing)
+        """
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold)
+        )
+
+    def create_payload_indexes(self) -> None:
+        """
+        Index the payload fields used in filters.
+
+        Keyword indexes serve exact matches on stock_id, data_type and date;
+        the integer date_days index (range only) serves date range filters.
+        Points stored before date_days existed are backfilled so range
+        filters do not drop them.
+        """
+        keyword_fields = ["stock_id", "data_type", "date"]
+        for field_name in keyword_fields:
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
+
+        self.client.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="date_days",
+            field_schema=IntegerIndexParams(
+                type=IntegerIndexType.INTEGER,
+                lookup=False,
+                range=True,
+            ),
+        )
+
+        backfilled = self.backfill_date_days()
+        if backfilled:
+            print(f"Backfilled date_days on {backfilled} points")
+
+    def backfill_date_days(self) -> int:
+        """
+        Add the date_days payload field to points that lack it.
+
+        Returns:
+            Number of points updated
+        """
+        missing = Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="date_days"))])
+        updated = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=missing,
+                limit=1000,
+                offset=offset,
+                with_payload=["date"],
+                with_vectors=False
+            )
+
+            # One set_payload request per distinct date
+            ids_by_days = {}
+            for point in points:
+                try:
+                    days = date_to_days(point.payload.get("date", ""))
+                except ValueError:
+                    continue  # No usable date; range filters cannot match it
+                ids_by_days.setdefault(days, []).append(point.id)
+
+            for days, ids in ids_by_days.items():
+                self.client.set_payload(
+                    collection_name=self.collection_name,
+                    payload={"date_days": days},
+                    points=ids
+                )
+                updated += len(ids)
+
+            if offset is None:
+                return updated
+
+    @staticmethod
+    def make_point_id(stock_id: str, date: str, data_type: str) -> int:
+        """
+        Derive the deterministic point ID of a (stock, date, data type) entry.
+
+        Args:
+            stock_id: Stock code
+            date: Date of data
+            data_type: Type of data (technical/fundamental)
+
+        Returns:
+            Unsigned 64-bit integer point ID
+        """
+        unique_key = f"{stock_id}_{date}_{data_type}"
+        # Qdrant takes unsigned 64-bit IDs directly; xxh64 of the key is
+        # unique enough for a few stocks x days and skips the UUID round-trip
+        return xxhash.xxh64_intdigest(unique_key.encode())
+
+    def get_existing_keys(self, stock_id: str) -> set[tuple[str, str]]:
+        """
+        Fetch the (date, data_type) keys already stored for a stock.
+
+        Scrolls the payloads only, so existence checks during sync become
+        set lookups instead of one request each.
+
+        Args:
+            stock_id: Stock code
+
+        Returns:
+            Set of (date, data_type) tuples
+        """
+        scroll_filter = Filter(
+            must=[FieldCondition(key="stock_id", match=MatchValue(value=stock_id))]
+        )
+        keys = set()
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=10_000,
+                offset=offset,
+                with_payload=["date", "data_type"],
+                with_vectors=False
+            )
+            for point in points:
+                keys.add((point.payload.get("date", ""), point.payload.get("data_type", "")))
+            if offset is None:
+                return keys
+
+    def build_point(
         self,
         text: str,
-        vector: list[float],
+        vector: Union[list[float], np.ndarray],
         stock_id: str,
         stock_name: str,
         date: str,
         data_type: str,
         metadata: Optional[dict] = None
-    ) -> str:
+    ) -> PointStruct:
         """
-        Insert stock data into vector database.
+        Build a point for stock data without sending it.
 
         Args:
             text: Text description
-            vector: Embedding vector
+            vector: Embedding vector (numpy arrays are converted as float32)
             stock_id: Stock code
             stock_name: Stock name
             date: Date of data
@@ -100,60 +352,120 @@ class StockVectorDB:
             metadata: Additional metadata
 
         Returns:
-            Point ID
+            Point ready for upsert
         """
-        unique_key = f"{stock_id}_{date}_{data_type}"
-        # Generate UUID from SHA256 hash (take first 32 hex chars = 128 bits)
-        hash_hex = hashlib.sha256(unique_key.encode()).hexdigest()[:32]
-        point_id = str(uuid.UUID(hex=hash_hex))
-
         payload = {
             "text": text,
             "stock_id": stock_id,
             "stock_name": stock_name,
             "date": date,
+            "date_days": date_to_days(date),
             "data_type": data_type,
         }
 
         if metadata:
             payload["metadata"] = metadata
 
-        point = PointStruct(
-            id=point_id,
-            vector=vector,
+        return PointStruct(
+            id=self.make_point_id(stock_id, date, data_type),
+            vector=np.asarray(vector, dtype=np.float32).tolist(),
             payload=payload
         )
 
+    def insert_stock_data(
+        self,
+        text: str,
+        vector: list[float],
+        stock_id: str,
+        stock_name: str,
+        date: str,
+        data_type: str,
+        metadata: Optional[dict] = None
+    ) -> str:
+        """
+        Insert stock data into vector database.
+
+        Args:
+            text: Text description
+            vector: Embedding vector
+            stock_id: Stock code
+            stock_name: Stock name
+            date: Date of data
+            data_type: Type of data (technical/fundamental)
+            metadata: Additional metadata
+
+        Returns:
+            Point ID
+        """
+        point = self.build_point(
+            text, vector, stock_id, stock_name, date, data_type, metadata
+        )
+
         self.client.upsert(
             collection_name=self.collection_name,
             points=[point]
         )
 
-        return point_id
+        return str(point.id)
 
-    def search(
-        self,
-        query_vector: list[float],
-        limit: int = 5,
+    def insert_stock_data_batch(self, points: list[PointStruct]) -> None:
+        """
+        Insert many points with a single upsert request.
+
+        The request returns once Qdrant has accepted the points, without
+        waiting for them to be indexed.
+
+        Args:
+            points: Points built with build_point
+        """
+        if not points:
+            return
+
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=points,
+            wait=False
+        )
+
+    async def ainsert_stock_data_batch(self, points: list[PointStruct]) -> None:
+        """
+        Async variant of insert_stock_data_batch using the async client.
+
+        Lets several batches be in flight at once during sync.
+
+        Args:
+            points: Points built with build_point
+        """
+        if not points:
+            return
+
+        await self.aclient.upsert(
+            collection_name=self.collection_name,
+            points=points,
+            wait=False
+        )
+
+    @staticmethod
+    def build_filter(
         stock_id: Optional[str] = None,
         data_type: Optional[str] = None,
-        filter_conditions: Optional[dict] = None
-    ) -> list[dict]:
+        filter_conditions: Optional[dict] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Optional[Filter]:
         """
-        Search for similar vectors.
+        Build the payload filter of a search.
 
         Args:
-            query_vector: Query embedding vector
-            limit: Number of results to return
             stock_id: Filter by stock ID (optional)
             data_type: Filter by data type (optional)
             filter_conditions: Custom filter conditions (optional)
-                Example: {"must": [{"key": "date", "match": {"value": "2024-01-01"}}]}
+            start_date: Earliest date, YYYY-MM-DD (optional)
+            end_date: Latest date, YYYY-MM-DD (optional)
 
         Returns:
-            List of search results with text and metadata
+            Filter, or None when nothing is filtered
         """
-        # Build filters
         filters = []
         if stock_id:
             filters.append(
@@ -164,6 +476,17 @@ class StockVectorDB:
                 FieldCondition(key="data_type", match=MatchValue(value=data_type))
             )
 
+        if start_date or end_date:
+            filters.append(
+                FieldCondition(
+                    key="date_days",
+                    range=Range(
+                        gte=date_to_days(start_date) if start_date else None,
+                        lte=date_to_days(end_date) if end_date else None,
+                    )
+                )
+            )
+
         # Add custom filter conditions
         if filter_conditions and "must" in filter_conditions:
             for condition in filter_conditions["must"]:
@@ -174,27 +497,125 @@ class StockVectorDB:
                     )
                 )
 
-        query_filter = Filter(must=filters) if filters else None
+        return Filter(must=filters) if filters else None
 
-        results = self.client.search(
+    @staticmethod
+    def build_search_params(
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None
+    ) -> SearchParams:
+        """Rescore oversampled quantized candidates with the original vectors."""
+        return SearchParams(
+            quantization=QuantizationSearchParams(
+                rescore=settings.qdrant.rescore if rescore is None else rescore,
+                oversampling=settings.qdrant.oversampling if oversampling is None else oversampling
+            )
+        )
+
+    @staticmethod
+    def _to_result(point) -> dict:
+        """Convert a scored point into a search result dict."""
+        return {
+            "id": str(point.id),
+            "score": point.score,
+            "text": point.payload.get("text", ""),
+            "stock_id": point.payload.get("stock_id", ""),
+            "stock_name": point.payload.get("stock_name", ""),
+            "date": point.payload.get("date", ""),
+            "data_type": point.payload.get("data_type", ""),
+            "metadata": point.payload.get("metadata", {})
+        }
+
+    def search(
+        self,
+        query_vector: list[float],
+        limit: int = 5,
+        stock_id: Optional[str] = None,
+        data_type: Optional[str] = None,
+        filter_conditions: Optional[dict] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None
+    ) -> list[dict]:
+        """
+        Search for similar vectors.
+
+        Args:
+            query_vector: Query embedding vector
+            limit: Number of results to return
+            stock_id: Filter by stock ID (optional)
+            data_type: Filter by data type (optional)
+            filter_conditions: Custom filter conditions (optional)
+                Example: {"must": [{"key": "date", "match": {"value": "2024-01-01"}}]}
+            start_date: Only return data on or after this date (YYYY-MM-DD, optional)
+            end_date: Only return data on or before this date (YYYY-MM-DD, optional)
+            oversampling: Quantized candidates fetched per result (default: from config)
+            rescore: Rescore candidates with the original vectors (default: from config)
+
+        Returns:
+            List of search results with text and metadata
+        """
+        response = self.client.query_points(
             collection_name=self.collection_name,
-            query_vector=query_vector,
+            query=query_vector,
             limit=limit,
-            query_filter=query_filter
+            query_filter=self.build_filter(
+                stock_id, data_type, filter_conditions, start_date, end_date
+            ),
+            search_params=self.build_search_params(oversampling, rescore),
+            with_payload=True
+        )
+
+        return [self._to_result(result) for result in response.points]
+
+    def search_batch(
+        self,
+        query_vectors: list[list[float]],
+        limit: int = 5,
+        stock_id: Optional[str] = None,
+        data_type: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> list[list[dict]]:
+        """
+        Run several searches with the same filters in one request.
+
+        Args:
+            query_vectors: Query embedding vectors
+            limit: Number of results per query
+            stock_id: Filter by stock ID (optional)
+            data_type: Filter by data type (optional)
+            start_date: Only return data on or after this date (YYYY-MM-DD, optional)
+            end_date: Only return data on or before this date (YYYY-MM-DD, optional)
+
+        Returns:
+            One list of search results per query vector, in input order
+        """
+        if not query_vectors:
+            return []
+
+        query_filter = self.build_filter(
+            stock_id, data_type, start_date=start_date, end_date=end_date
+        )
+        params = self.build_search_params()
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                QueryRequest(
+                    query=vector,
+                    filter=query_filter,
+                    limit=limit,
+                    params=params,
+                    with_payload=True
+                )
+                for vector in query_vectors
+            ]
         )
 
         return [
-            {
-                "id": str(result.id),
-                "score": result.score,
-                "text": result.payload.get("text", ""),
-                "stock_id": result.payload.get("stock_id", ""),
-                "stock_name": result.payload.get("stock_name", ""),
-                "date": result.payload.get("date", ""),
-                "data_type": result.payload.get("data_type", ""),
-                "metadata": result.payload.get("metadata", {})
-            }
-            for result in results
+            [self._to_result(result) for result in response.points]
+            for response in responses
         ]
 
     def get_collection_info(self) -> dict:
@@ -213,6 +634,7 @@ class StockVectorDB:
         """Delete the collection."""
         try:
             self.client.delete_collection(collection_name=self.collection_name)
+            self._collection_ready = False
             print(f"Collection '{self.collection_name}' deleted")
             return True
         except Exception as e:
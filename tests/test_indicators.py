@@ -0,0 +1,119 @@
+"""Parity of the fused indicator kernel with the TA library."""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+import ta
+
+from tw_stock_analyst.data.indicators import (
+    ATR_WINDOW,
+    INDICATOR_COLUMNS,
+    TechnicalIndicators,
+)
+
+
+def ta_atr(df: pd.DataFrame) -> pd.Series:
+    """TA library ATR; it raises on series shorter than its window."""
+    if len(df) < ATR_WINDOW:
+        # Every value would be warm-up, which TA fills with 0
+        return pd.Series(0.0, index=df.index)
+    return ta.volatility.average_true_range(df['High'], df['Low'], df['Close'])
+
+
+def ta_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """Reference indicators computed with the TA library (fillna=False)."""
+    close, high, low = df['Close'], df['High'], df['Low']
+    macd = ta.trend.MACD(close)
+    bollinger = ta.volatility.BollingerBands(close)
+    stoch = ta.momentum.StochasticOscillator(high, low, close)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return pd.DataFrame({
+            'MA5': ta.trend.sma_indicator(close, window=5),
+            'MA10': ta.trend.sma_indicator(close, window=10),
+            'MA20': ta.trend.sma_indicator(close, window=20),
+            'MA60': ta.trend.sma_indicator(close, window=60),
+            'EMA12': ta.trend.ema_indicator(close, window=12),
+            'EMA26': ta.trend.ema_indicator(close, window=26),
+            'RSI': ta.momentum.rsi(close, window=14),
+            'MACD': macd.macd(),
+            'MACD_Signal': macd.macd_signal(),
+            'MACD_Diff': macd.macd_diff(),
+            'BB_High': bollinger.bollinger_hband(),
+            'BB_Mid': bollinger.bollinger_mavg(),
+            'BB_Low': bollinger.bollinger_lband(),
+            'K': stoch.stoch(),
+            'D': stoch.stoch_signal(),
+            'ATR': ta_atr(df),
+            'OBV': ta.volume.on_balance_volume(close, df['Volume']),
+            'Price_Change': close.pct_change(fill_method=None) * 100,
+        })
+
+
+def make_bars(n: int, seed: int = 0) -> pd.DataFrame:
+    """Random-walk OHLCV bars with prices on a 0.05 tick."""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 2)
+    spread = np.round(rng.uniform(0.1, 2.0, n), 2)
+    return pd.DataFrame({
+        'Date': pd.date_range("2024-01-01", periods=n).strftime("%Y-%m-%d"),
+        'Open': close,
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000, 50_000_000, n),
+    })
+
+
+def with_nan_gaps(df: pd.DataFrame) -> pd.DataFrame:
+    """Missing prices in the middle of the series."""
+    df = df.copy()
+    df.loc[[40, 41, 90], ['High', 'Low', 'Close']] = np.nan
+    return df
+
+
+def with_flat_window(df: pd.DataFrame) -> pd.DataFrame:
+    """High == Low over a whole stochastic window, so %K is 0/0."""
+    df = df.copy()
+    df.loc[30:50, ['Open', 'High', 'Low', 'Close']] = 50.0
+    return df
+
+
+def as_float32(df: pd.DataFrame) -> pd.DataFrame:
+    """Same bars with float32 prices."""
+    return df.astype({col: 'float32' for col in ['Open', 'High', 'Low', 'Close']})
+
+
+CASES = {
+    "random_walk": make_bars(250),
+    "nan_gaps": with_nan_gaps(make_bars(150, seed=1)),
+    "shorter_than_60": make_bars(45, seed=2),
+    "shorter_than_14": make_bars(10, seed=3),
+    "flat_high_low": with_flat_window(make_bars(120, seed=4)),
+    "float32_prices": as_float32(make_bars(200, seed=5)),
+}
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_matches_ta(name):
+    df = CASES[name]
+    result = TechnicalIndicators.add_all_indicators(df)
+
+    # The kernel reads float32 prices, so the reference sees the same values
+    reference = ta_indicators(as_float32(df).astype(
+        {col: 'float64' for col in ['Open', 'High', 'Low', 'Close']}
+    ))
+
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(
+            result[col].to_numpy(), reference[col].to_numpy(),
+            rtol=1e-7, atol=1e-7, equal_nan=True, err_msg=col
+        )
+
+
+def test_keeps_input_prices():
+    df = make_bars(80)
+    result = TechnicalIndicators.add_all_indicators(df)
+    pd.testing.assert_frame_equal(result[df.columns], df)